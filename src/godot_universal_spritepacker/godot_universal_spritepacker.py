@@ -8,21 +8,20 @@ __repository__ = 'https://github.com/Donitzo/godot-universal-spritepacker'
 # --------------------------------------------------------------------------------------------------
 
 import argparse
-import csv
-import json
 import math
 import os
 import re
-import subprocess
+import struct
 import sys
-import tempfile
-import time
-import xml.etree.ElementTree as ET
 
-from PIL import Image
-from rectpack import newPacker, PackerBFF
-from rectpack.guillotine import GuillotineBssfSas
-from typing import cast, Dict, List, Optional, Tuple, TypedDict
+from typing import cast, Dict, List, Optional, Tuple, TypedDict, TYPE_CHECKING
+
+# Heavy modules (Pillow, rectpack, csv, subprocess, XML) are imported inside the stage that uses
+# them, so --help and --dry_run start quickly
+if TYPE_CHECKING:
+    import xml.etree.ElementTree as ET
+
+    from PIL import Image
 
 # Minimum and maximum supported Python versions
 class UnsupportedVersion(Exception):
@@ -34,7 +33,7 @@ if sys.version_info < MIN_VERSION or sys.version_info >= VERSION_LESS_THAN:
         ('.'.join(map(str, MIN_VERSION)), '.'.join(map(str, VERSION_LESS_THAN))))
 
 # Replace with your own custom image postprocessor
-def postprocessor(image: Image.Image, x: int, y: int) -> Image.Image:
+def postprocessor(image: 'Image.Image', x: int, y: int) -> 'Image.Image':
     return image
 
 # TypedDict definitions for strong typing
@@ -51,11 +50,12 @@ class RectDict(TypedDict, total=True):
 class SpriteDict(TypedDict, total=True):
     animated: bool
     frame: RectDict
-    image: Image.Image
+    image: Optional['Image.Image']
     name: str
     margin: RectDict
     remove: bool
     resource_path: str
+    size: SizeDict
     trimmed: bool
 
 class AnimationDict(TypedDict, total=True):
@@ -96,11 +96,12 @@ class AtlasDict(TypedDict, total=True):
 
 RectTuple = Tuple[int, int, int, int, SpriteDict]
 
+
 # --------------------------------------------------------------------------------------------------
 # Command-line argument parsing
 # --------------------------------------------------------------------------------------------------
 
-def main() -> None:
+def parse_arguments() -> argparse.Namespace:
     parser: argparse.ArgumentParser = argparse.ArgumentParser(
         description=
             'Godot Universal SpritePacker — split, pack, and convert spritesheets' +
@@ -132,27 +133,225 @@ def main() -> None:
         help='The minimum margin to keep after trimming sprites.')
     parser.add_argument('--default_framerate', type=int,
         help='If set, treats all regular sprites as animations with this framerate.')
+    parser.add_argument('--reproducible', action='store_true',
+        help='If set, traverses source files in sorted order and writes PNGs with fixed encoder' +
+            ' settings and no metadata, so identical inputs produce identical output bytes.')
+    parser.add_argument('--hash_spritesheet_names', action='store_true',
+        help='If set, appends a hash of the spritesheet image contents to its filename.')
+    parser.add_argument('--dry_run', action='store_true',
+        help='If set, only reports the sprites, animations, spritesheets and files that would be' +
+            ' produced. Image sizes are read from file headers and nothing is written.')
 
-    args: argparse.Namespace = parser.parse_args()
+    return parser.parse_args()
 
-    print('Godot Universal SpritePacker %s\n' % __version__)
+# --------------------------------------------------------------------------------------------------
+# Header-only image dimensions (used by --dry_run)
+# --------------------------------------------------------------------------------------------------
+
+# SVG length units in CSS pixels (96 DPI, same as Inkscape)
+SVG_UNITS: Dict[str, float] = {
+    '': 1.0, 'px': 1.0, 'pt': 96 / 72, 'pc': 16.0, 'mm': 96 / 25.4, 'cm': 96 / 2.54, 'in': 96.0,
+}
+
+def read_image_size(path: str) -> Tuple[int, int]:
+    with open(path, 'rb') as f:
+        header: bytes = f.read(26)
+
+        # PNG: width and height are the first fields of the IHDR chunk
+        if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+            return cast(Tuple[int, int], struct.unpack('>II', header[16:24]))
+
+        # BMP: OS/2 headers use 16-bit sizes, Windows headers use signed 32-bit sizes
+        if header[:2] == b'BM':
+            if struct.unpack('<I', header[14:18])[0] == 12:
+                return cast(Tuple[int, int], struct.unpack('<HH', header[18:22]))
+            width, height = struct.unpack('<ii', header[18:26])
+            return width, abs(height)
+
+        # JPEG: walk the segments until a start-of-frame marker
+        if header[:2] == b'\xff\xd8':
+            f.seek(2)
+            while True:
+                byte: bytes = f.read(1)
+                if byte == b'':
+                    break
+                if byte != b'\xff':
+                    continue
+
+                marker: int = ord(f.read(1) or b'\x00')
+                if marker == 0xff or marker == 0x01 or 0xd0 <= marker <= 0xd9:
+                    if marker == 0xff:
+                        f.seek(-1, os.SEEK_CUR)
+                    continue
+
+                length: int = struct.unpack('>H', f.read(2))[0]
+                if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+
+    # Unknown layout: Pillow only parses the header until pixel data is accessed
+    from PIL import Image
+
+    with Image.open(path) as im:
+        return im.size
+
+def read_svg_size(root: 'ET.Element') -> Tuple[int, int]:
+    view_box: List[str] = root.attrib.get('viewBox', '').replace(',', ' ').split()
+
+    size: List[int] = []
+    for i, attribute in enumerate(['width', 'height']):
+        match: Optional[re.Match[str]] = re.match(r'^\s*([0-9.]+)\s*([a-z]*)\s*$',
+            root.attrib.get(attribute, ''))
+
+        if match and match.group(2) in SVG_UNITS:
+            size.append(math.ceil(float(match.group(1)) * SVG_UNITS[match.group(2)]))
+        elif len(view_box) == 4:
+            size.append(math.ceil(float(view_box[2 + i])))
+        else:
+            size.append(0)
+
+    return size[0], size[1]
+
+# --------------------------------------------------------------------------------------------------
+# Create all individual sprites
+# --------------------------------------------------------------------------------------------------
+
+def create_sprite(name: str, image: Optional['Image.Image'], size: Tuple[int, int]) -> SpriteDict:
+    return {
+        'animated': False,
+        'frame': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
+        'image': image,
+        'margin': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
+        'name': name,
+        'remove': False,
+        'resource_path': '',
+        'size': { 'w': size[0], 'h': size[1] },
+        'trimmed': False,
+    }
+
+def open_image(path: str) -> 'Image.Image':
+    from PIL import Image
+
+    return Image.open(path).convert('RGBA')
+
+def get_layer_name(name: str, label: str) -> str:
+    return '%s/%s' % (name, re.sub('[^a-zA-Z0-9_ -]+', '', label))
+
+def export_svg_layers(args: argparse.Namespace, source_path: str, name: str,
+    sprites: List[SpriteDict]) -> None:
+    import xml.etree.ElementTree as ET
+
+    tree = ET.parse(source_path)
+    layers: List[ET.Element] = tree.findall("./{http://www.w3.org/2000/svg}" +
+        "g[@{http://www.inkscape.org/namespaces/inkscape}groupmode='layer']")
+
+    if args.dry_run:
+        # Layers are exported with their drawing area, which can be smaller or larger than the
+        # page, so the page size is only an estimate
+        svg_size: Tuple[int, int] = read_svg_size(tree.getroot())
+
+        for layer in layers:
+            label: str = layer.attrib['{http://www.inkscape.org/namespaces/inkscape}label']
+
+            print('-> Exporting layer "%s"' % label)
+
+            sprites.append(create_sprite(get_layer_name(name, label), None, svg_size))
+
+        return
+
+    import subprocess
+    import tempfile
+    import time
+
+    for layer in layers:
+        layer_id: str = layer.attrib['id']
+        label = layer.attrib['{http://www.inkscape.org/namespaces/inkscape}label']
+
+        print('-> Exporting layer "%s"' % label)
+
+        image_path: str = os.path.join(tempfile.gettempdir(),
+            'gus_%s.png' % os.urandom(12).hex())
+
+        # call Inkscape to export one layer as PNG
+        try:
+            result: subprocess.CompletedProcess = subprocess.run([
+                args.inkscape_path,
+                source_path,
+                '--export-area-drawing',
+                '--export-type=png',
+                '--export-id-only',
+                '--export-id=%s' % layer_id,
+                '--export-filename=%s' % image_path,
+            ])
+        except FileNotFoundError:
+            print('Unable to find Inkscape. Skipping vector conversion.')
+            continue
+
+        if result.returncode != 0:
+            sys.exit('Error exporting SVG layer "%s" from "%s"' % (label, source_path))
+
+        # Wait for output file to appear
+        for attempt in range(10):
+            if os.path.exists(image_path):
+                image: Image.Image = open_image(image_path)
+                sprites.append(create_sprite(get_layer_name(name, label), image, image.size))
+
+                break
+
+            if attempt == 9:
+                sys.exit('Error exporting SVG layer "%s" from "%s"'
+                    % (label, source_path))
+            else:
+                time.sleep(1)
+
+        # Clean up temp file
+        while os.path.exists(image_path):
+            try:
+                os.remove(image_path)
+            except OSError:
+                time.sleep(1)
+
+                print('Failed to delete temporary file')
 
-    # ----------------------------------------------------------------------------------------------
-    # Prepare output directory
-    # ----------------------------------------------------------------------------------------------
+def convert_svg(args: argparse.Namespace, source_path: str, image_path: str) -> bool:
+    import subprocess
 
-    spritesheet_dir: str = os.path.dirname(args.spritesheet_path)
-    if spritesheet_dir != '':
-        os.makedirs(spritesheet_dir, exist_ok=True)
+    try:
+        result: subprocess.CompletedProcess = subprocess.run([
+            args.inkscape_path,
+            source_path,
+            '--export-area-page',
+            '--export-type=png',
+            '--export-filename=%s' % image_path,
+        ])
+    except FileNotFoundError:
+        print('Unable to find Inkscape. Skipping vector conversion.')
+        return False
 
-    # ----------------------------------------------------------------------------------------------
-    # Create all individual sprites
-    # ----------------------------------------------------------------------------------------------
+    if result.returncode != 0 or not os.path.exists(image_path):
+        sys.exit('Error exporting SVG "%s" as PNG' % source_path)
 
+    return True
+
+def read_animations(csv_path: str) -> List[List[str]]:
+    import csv
+
+    with open(csv_path) as f:
+        return list(csv.reader(f, delimiter=';'))[1:]
+
+def collect_sprites(args: argparse.Namespace) -> \
+    Tuple[List[SpriteDict], List[SpriteFrameDict], List[str]]:
     sprites: List[SpriteDict] = []
     sprite_frames: List[SpriteFrameDict] = []
+    converted_paths: List[str] = []
 
     for root, dirs, filenames in os.walk(args.source_directory):
+        # os.walk order depends on the file system, sort in place to also order subdirectories
+        if args.reproducible:
+            dirs.sort()
+            filenames.sort()
+
         for filename in filenames:
             source_path: str = os.path.join(root, filename)
             source_directory: str = os.path.dirname(source_path)
@@ -165,6 +364,9 @@ def main() -> None:
             if name.startswith('./'):
                 name = name[2:]
 
+            # Page size of a converted SVG, whose PNG may not exist yet in a dry run
+            source_size: Optional[Tuple[int, int]] = None
+
             # SVG: split into layers via Inkscape or export as grid image
             if extension.lower() == '.svg':
                 print('Splitting vector file "%s"' % source_path)
@@ -172,85 +374,19 @@ def main() -> None:
                 if args.convert_svg_to_png:
                     image_path: str = os.path.splitext(source_path)[0] + '.png'
 
-                    try:
-                        result: subprocess.CompletedProcess = subprocess.run([
-                            args.inkscape_path,
-                            source_path,
-                            '--export-area-page',
-                            '--export-type=png',
-                            '--export-filename=%s' % image_path,
-                        ])
-                    except FileNotFoundError:
-                        print('Unable to find Inkscape. Skipping vector conversion.')
+                    if args.dry_run:
+                        import xml.etree.ElementTree as ET
+
+                        source_size = read_svg_size(ET.parse(source_path).getroot())
+                    elif not convert_svg(args, source_path, image_path):
                         continue
 
-                    if result.returncode != 0 or not os.path.exists(image_path):
-                        sys.exit('Error exporting SVG "%s" as PNG' % source_path)
+                    converted_paths.append(image_path)
 
                     source_path = image_path
                     extension = '.png'
                 else:
-                    tree: ET.ElementTree = ET.parse(source_path)
-                    layers: List[ET.Element] = tree.findall("./{http://www.w3.org/2000/svg}" +
-                        "g[@{http://www.inkscape.org/namespaces/inkscape}groupmode='layer']")
-
-                    for layer in layers:
-                        layer_id: str = layer.attrib['id']
-                        label: str = layer.attrib['{http://www.inkscape.org/namespaces/inkscape}label']
-
-                        print('-> Exporting layer "%s"' % label)
-
-                        image_path: str = os.path.join(tempfile.gettempdir(),
-                            'gus_%s.png' % os.urandom(12).hex())
-
-                        # call Inkscape to export one layer as PNG
-                        try:
-                            result: subprocess.CompletedProcess = subprocess.run([
-                                args.inkscape_path,
-                                source_path,
-                                '--export-area-drawing',
-                                '--export-type=png',
-                                '--export-id-only',
-                                '--export-id=%s' % layer_id,
-                                '--export-filename=%s' % image_path,
-                            ])
-                        except FileNotFoundError:
-                            print('Unable to find Inkscape. Skipping vector conversion.')
-                            continue
-
-                        if result.returncode != 0:
-                            sys.exit('Error exporting SVG layer "%s" from "%s"' % (label, source_path))
-
-                        # Wait for output file to appear
-                        for attempt in range(10):
-                            if os.path.exists(image_path):
-                                sprites.append(cast(SpriteDict, {
-                                    'animated': False,
-                                    'frame': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
-                                    'image': Image.open(image_path).convert('RGBA'),
-                                    'margin': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
-                                    'name': '%s/%s' % (name, re.sub('[^a-zA-Z0-9_ -]+', '', label)),
-                                    'remove': False,
-                                    'resource_path': '',
-                                    'trimmed': False,
-                                }))
-
-                                break
-
-                            if attempt == 9:
-                                sys.exit('Error exporting SVG layer "%s" from "%s"'
-                                    % (label, source_path))
-                            else:
-                                time.sleep(1)
-
-                        # Clean up temp file
-                        while os.path.exists(image_path):
-                            try:
-                                os.remove(image_path)
-                            except OSError:
-                                time.sleep(1)
-
-                                print('Failed to delete temporary file')
+                    export_svg_layers(args, source_path, name, sprites)
 
                     continue
 
@@ -263,6 +399,14 @@ def main() -> None:
 
                 continue
 
+            im: Optional[Image.Image] = None
+            if args.dry_run:
+                if source_size is None:
+                    source_size = read_image_size(source_path)
+            else:
+                im = open_image(source_path)
+                source_size = im.size
+
             # Static image vs tileset detection
             match: Optional[re.Match[str]] = re.search(
                 r'^(.*?)__(\d+)x(\d+)(?:p(\d+))?(?:fps(\d+))?(loop)?(_post)?$', name)
@@ -272,16 +416,7 @@ def main() -> None:
 
                 print('Using single image "%s"' % source_path)
 
-                sprites.append(cast(SpriteDict, {
-                    'animated': False,
-                    'frame': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
-                    'image': Image.open(source_path).convert('RGBA'),
-                    'margin': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
-                    'name': name,
-                    'remove': False,
-                    'resource_path': '',
-                    'trimmed': False,
-                }))
+                sprites.append(create_sprite(name, im, source_size))
 
                 continue
 
@@ -293,9 +428,7 @@ def main() -> None:
 
             image_name: str = groups[0] # type: ignore[assignment]
 
-            im: Image.Image = Image.open(source_path).convert('RGBA')
-
-            full_width, full_height = im.size
+            full_width, full_height = source_size
 
             tile_width: int = int(groups[1]) # type: ignore[arg-type]
             tile_height: int = int(groups[2]) # type: ignore[arg-type]
@@ -315,20 +448,17 @@ def main() -> None:
                 for x_i, x in enumerate(start_x):
                     x_s: str = str(x_i).zfill(len(str(len(start_x) - 1)))
 
-                    new_image: Image.Image = im.crop((x, y, x + tile_width, y + tile_height))
-                    if groups[6] is not None:
-                        new_image = postprocessor(new_image, x_i, y_i)
-
-                    sprite: SpriteDict = {
-                        'animated': False,
-                        'frame': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
-                        'image': new_image,
-                        'margin': { 'x': 0, 'y': 0, 'w': 0, 'h': 0 },
-                        'name': '%s__%sx%s' % (image_name, y_s, x_s),
-                        'remove': False,
-                        'resource_path': '',
-                        'trimmed': False,
-                    }
+                    new_image: Optional[Image.Image] = None
+                    tile_size: Tuple[int, int] = (tile_width, tile_height)
+
+                    if im is not None:
+                        new_image = im.crop((x, y, x + tile_width, y + tile_height))
+                        if groups[6] is not None:
+                            new_image = postprocessor(new_image, x_i, y_i)
+                        tile_size = new_image.size
+
+                    sprite: SpriteDict = create_sprite(
+                        '%s__%sx%s' % (image_name, y_s, x_s), new_image, tile_size)
 
                     sprites.append(sprite)
                     tileset_sprites.append(sprite)
@@ -349,10 +479,7 @@ def main() -> None:
                 for sprite in tileset_sprites:
                     sprite['remove'] = True
 
-                with open(csv_path) as f:
-                    lines: List[List[str]] = list(csv.reader(f, delimiter=';'))[1:]
-
-                for line in lines:
+                for line in read_animations(csv_path):
                     line = [cell.strip() for cell in line]
 
                     animation_sprites: List[SpriteDict] = []
@@ -405,78 +532,114 @@ def main() -> None:
 
             sprite_frames.append(sprite_frame)
 
-    # ----------------------------------------------------------------------------------------------
     # Filter out any sprites marked for removal (due to .csv animations)
-    # ----------------------------------------------------------------------------------------------
-
     sprites = list(filter(lambda sprite:
         not 'remove' in sprite or not sprite['remove'], sprites))
 
-    if len(sprites) == 0:
-        sys.exit('\nNo sprites found')
+    return sprites, sprite_frames, converted_paths
 
-    # ----------------------------------------------------------------------------------------------
-    # Export each sprite as its own image
-    # ----------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------
+# Export each sprite as its own image
+# --------------------------------------------------------------------------------------------------
 
-    if not args.image_directory is None:
-        print('\nSaving sprite images in "%s"' % args.image_directory)
+def encode_png(args: argparse.Namespace, image: 'Image.Image') -> bytes:
+    import io
 
-        for sprite in sprites:
-            image_path = os.path.join(args.image_directory, '%s.png' % sprite['name'])
-            image_directory: str = os.path.dirname(image_path)
+    buffer: io.BytesIO = io.BytesIO()
 
-            os.makedirs(image_directory, exist_ok=True)
+    if args.reproducible:
+        # Pin encoder settings and drop ICC profiles carried over from source images
+        image.save(buffer, format='PNG', optimize=False, compress_level=6, icc_profile=None)
+    else:
+        image.save(buffer, format='PNG')
 
-            sprite['image'].save(image_path)
+    return buffer.getvalue()
 
-    # ----------------------------------------------------------------------------------------------
-    # Trimming
-    # ----------------------------------------------------------------------------------------------
+def save_sprite_images(args: argparse.Namespace, sprites: List[SpriteDict]) -> None:
+    print('\nSaving sprite images in "%s"' % args.image_directory)
 
-    if not args.disable_trimming:
-        print('\nTrimming sprites...')
+    for sprite in sprites:
+        image_path: str = os.path.join(args.image_directory, '%s.png' % sprite['name'])
+        image_directory: str = os.path.dirname(image_path)
 
-        trimmed_count: int = 0
-        trimmed_pixels: int = 0
+        os.makedirs(image_directory, exist_ok=True)
 
-        for sprite in sprites:
-            w, h = sprite['image'].size
-
-            bbox: Optional[Tuple[int, int, int, int]] = sprite['image'].getbbox()
-            if bbox is None:
-                bbox = (0, 0, 1, 1)
-
-            if bbox != (0, 0, w, h):
-                sprite['trimmed'] = True
-                left = max(0, bbox[0] - args.min_trim_margin)
-                top = max(0, bbox[1] - args.min_trim_margin)
-                right = min(w, bbox[2] + args.min_trim_margin)
-                bottom = min(h, bbox[3] + args.min_trim_margin)
-                sprite['image'] = sprite['image'].crop((left, top, right, bottom))
-                sprite['margin'] = {
-                    'x': left,
-                    'y': top,
-                    'w': w - (right - left),
-                    'h': h - (bottom - top),
-                }
-                trimmed_count += 1
-                trimmed_pixels += (w * h) - (sprite['image'].size[0] * sprite['image'].size[1])
+        with open(image_path, 'wb') as f:
+            f.write(encode_png(args, cast('Image.Image', sprite['image'])))
+
+# --------------------------------------------------------------------------------------------------
+# Trimming
+# --------------------------------------------------------------------------------------------------
+
+def trim_sprites(args: argparse.Namespace, sprites: List[SpriteDict]) -> None:
+    print('\nTrimming sprites...')
 
-        print('Trimmed %i sprites for %i pixels' % (trimmed_count, trimmed_pixels))
+    trimmed_count: int = 0
+    trimmed_pixels: int = 0
+
+    for sprite in sprites:
+        image: Image.Image = cast('Image.Image', sprite['image'])
+
+        w, h = image.size
+
+        bbox: Optional[Tuple[int, int, int, int]] = image.getbbox()
+        if bbox is None:
+            bbox = (0, 0, 1, 1)
+
+        if bbox != (0, 0, w, h):
+            sprite['trimmed'] = True
+            left = max(0, bbox[0] - args.min_trim_margin)
+            top = max(0, bbox[1] - args.min_trim_margin)
+            right = min(w, bbox[2] + args.min_trim_margin)
+            bottom = min(h, bbox[3] + args.min_trim_margin)
+            image = image.crop((left, top, right, bottom))
+            sprite['image'] = image
+            sprite['size'] = { 'w': image.size[0], 'h': image.size[1] }
+            sprite['margin'] = {
+                'x': left,
+                'y': top,
+                'w': w - (right - left),
+                'h': h - (bottom - top),
+            }
+            trimmed_count += 1
+            trimmed_pixels += (w * h) - (image.size[0] * image.size[1])
+
+    print('Trimmed %i sprites for %i pixels' % (trimmed_count, trimmed_pixels))
+
+# --------------------------------------------------------------------------------------------------
+# Pack all sprites into one or more atlases via rectpack
+# --------------------------------------------------------------------------------------------------
 
-    # ----------------------------------------------------------------------------------------------
-    # Pack all sprites into one or more atlases via rectpack
-    # ----------------------------------------------------------------------------------------------
+def pack_sprites(args: argparse.Namespace, sprites: List[SpriteDict]) -> \
+    Tuple[List[List[RectTuple]], int, int]:
+    from rectpack import newPacker, PackerBFF
+    from rectpack.guillotine import GuillotineBssfSas
 
     print('\nPacking %i sprites...' % len(sprites))
 
     padding: int = args.sprite_padding
     max_side: int = args.max_spritesheet_size
-    total_area: int = 0
+
+    packed_sprites: List[SpriteDict] = []
     for sprite in sprites:
-        w, h = sprite['image'].size
-        total_area += (w + padding * 2) * (h + padding * 2)
+        w, h = sprite['size']['w'], sprite['size']['h']
+
+        if w + padding * 2 > max_side or h + padding * 2 > max_side:
+            # Dry run sizes are untrimmed, so the sprite may still fit after trimming
+            if not args.dry_run:
+                sys.exit('Sprite "%s" is too large' % sprite["name"])
+
+            print('-> Sprite "%s" may be too large, excluded from estimate' % sprite["name"])
+        else:
+            packed_sprites.append(sprite)
+
+    # Only reachable in a dry run, where every sprite may have been excluded
+    if len(packed_sprites) == 0:
+        return [], 0, 0
+
+    total_area: int = 0
+    for sprite in packed_sprites:
+        total_area += (sprite['size']['w'] + padding * 2) * (sprite['size']['h'] + padding * 2)
     bin_size: int = min(max_side, 2 ** math.ceil(math.log2(math.ceil(math.sqrt(total_area)))))
     bin_count: int = 1
 
@@ -485,17 +648,14 @@ def main() -> None:
         for _ in range(bin_count):
             packer.add_bin(bin_size, bin_size)
 
-        for sprite in sprites:
-            w, h = sprite['image'].size
-
-            if w + padding * 2 > max_side or h + padding * 2 > max_side:
-                sys.exit('Sprite "%s" is too large' % sprite["name"])
+        for sprite in packed_sprites:
+            w, h = sprite['size']['w'], sprite['size']['h']
 
             packer.add_rect(w + padding * 2, h + padding * 2, sprite)
 
         packer.pack()
 
-        if len(packer) > 0 and len(packer.rect_list()) == len(sprites):
+        if len(packer) > 0 and len(packer.rect_list()) == len(packed_sprites):
             break
 
         if bin_size * 2 <= max_side:
@@ -503,16 +663,41 @@ def main() -> None:
         else:
             bin_count += 1
 
-    print('Packed %i sprites into %i spritesheets of size %ix%i\n'
-        % (len(sprites), bin_count, bin_size, bin_size))
+    # A dry run reports the estimate in its plan instead
+    if not args.dry_run:
+        print('Packed %i sprites into %i spritesheets of size %ix%i\n'
+            % (len(packed_sprites), bin_count, bin_size, bin_size))
 
-    # ----------------------------------------------------------------------------------------------
-    # Write out each packed atlas: PNG + JSON + Godot .tres files
-    # ----------------------------------------------------------------------------------------------
+    return [packer[b_i].rect_list() for b_i in range(bin_count)], bin_size, bin_count
 
-    for b_i in range(bin_count):
-        path_prefix: str = '%s%s' % (args.spritesheet_path, '' if bin_count == 1 else '_%i' % b_i)
-        png_path: str = '%s.png' % path_prefix
+# --------------------------------------------------------------------------------------------------
+# Write out each packed atlas: PNG + JSON + Godot .tres files
+# --------------------------------------------------------------------------------------------------
+
+def get_path_prefix(args: argparse.Namespace, b_i: int, bin_count: int) -> str:
+    return '%s%s' % (args.spritesheet_path, '' if bin_count == 1 else '_%i' % b_i)
+
+def get_png_path(args: argparse.Namespace, path_prefix: str, png_data: Optional[bytes]) -> str:
+    if not args.hash_spritesheet_names:
+        return '%s.png' % path_prefix
+
+    import hashlib
+
+    # The image is not rendered in a dry run, so the hash is unknown
+    digest: str = '<hash>' if png_data is None else hashlib.sha256(png_data).hexdigest()[:16]
+
+    return '%s_%s.png' % (path_prefix, digest)
+
+def write_atlases(args: argparse.Namespace, sprites: List[SpriteDict],
+    sprite_frames: List[SpriteFrameDict], bins: List[List[RectTuple]], bin_size: int) -> None:
+    import json
+
+    from PIL import Image
+
+    padding: int = args.sprite_padding
+
+    for b_i, rects in enumerate(bins):
+        path_prefix: str = get_path_prefix(args, b_i, len(bins))
 
         # Create an animation info and animations dictionary
         animation_info: Dict[str, AtlasAnimationDict] = {}
@@ -535,7 +720,7 @@ def main() -> None:
                 'animation_info': animation_info,
                 'app': 'Godot Universal SpritePacker',
                 'format': 'RGBA8888',
-                'image': os.path.basename('%s.png' % path_prefix),
+                'image': '',
                 'scale': 1,
                 'size': { 'w': bin_size, 'h': bin_size },
                 'version': __version__,
@@ -545,25 +730,33 @@ def main() -> None:
         bin_sprites: List[SpriteDict] = []
 
         rect: RectTuple
-        for rect in packer[b_i].rect_list():
+        for rect in rects:
             x, y, w, h, sprite = rect
 
             bin_sprites.append(sprite)
 
-            sw, sh = sprite['image'].size
+            sw, sh = sprite['size']['w'], sprite['size']['h']
 
-            sprite['resource_path'] = \
-                args.godot_resource_directory.strip('/') + '/' + os.path.basename(png_path)
             sprite['frame'] = { 'x': x + padding, 'y': y + padding, 'w': sw, 'h': sh }
 
-            atlas_image.paste(sprite['image'], (x + padding, y + padding))
+            atlas_image.paste(cast('Image.Image', sprite['image']), (x + padding, y + padding))
+
+        # Encode first, since a hashed filename depends on the image contents
+        png_data: bytes = encode_png(args, atlas_image)
+        png_path: str = get_png_path(args, path_prefix, png_data)
+
+        atlas_data['meta']['image'] = os.path.basename(png_path)
+
+        for sprite in bin_sprites:
+            sprite['resource_path'] = \
+                args.godot_resource_directory.strip('/') + '/' + os.path.basename(png_path)
 
         # Build JSON frame entries
         for sprite in sprites:
             if not sprite in bin_sprites:
                 continue
 
-            sw, sh = sprite['image'].size
+            sw, sh = sprite['size']['w'], sprite['size']['h']
 
             margin: RectDict = sprite['margin']
 
@@ -605,65 +798,68 @@ margin = Rect2(%i, %i, %i, %i)''' % (
                         margin['x'], margin['y'], margin['w'], margin['h']
                     ))
 
-        atlas_image.save(png_path)
+        # A hashed spritesheet that already exists is identical, so leave it untouched
+        if not args.hash_spritesheet_names or not os.path.exists(png_path):
+            with open(png_path, 'wb') as f:
+                f.write(png_data)
 
         if args.save_json:
             with open('%s.json' % path_prefix, 'w', encoding='utf-8') as f:
                 json.dump(atlas_data, f, indent=4, sort_keys=True)
 
-        print('Spritesheet %i created at "%s.png"' % (b_i, path_prefix))
+        print('Spritesheet %i created at "%s"' % (b_i, png_path))
 
-    # ----------------------------------------------------------------------------------------------
-    # Save Godot SpriteFrames resources
-    # ----------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------
+# Save Godot SpriteFrames resources
+# --------------------------------------------------------------------------------------------------
 
-    if not args.godot_sprites_directory is None:
-        print('\nCreating Godot sprite frames in "%s"' % args.godot_sprites_directory)
+def write_sprite_frames(args: argparse.Namespace, sprite_frames: List[SpriteFrameDict]) -> None:
+    print('\nCreating Godot sprite frames in "%s"' % args.godot_sprites_directory)
 
-        for sprite_frame in sprite_frames:
-            tres_path = os.path.join(args.godot_sprites_directory, f'{sprite_frame["name"]}.tres')
-            tres_directory = os.path.dirname(tres_path)
+    for sprite_frame in sprite_frames:
+        tres_path = os.path.join(args.godot_sprites_directory, f'{sprite_frame["name"]}.tres')
+        tres_directory = os.path.dirname(tres_path)
 
-            os.makedirs(tres_directory, exist_ok=True)
+        os.makedirs(tres_directory, exist_ok=True)
 
-            sprite_frames_string: str = '[gd_resource type="SpriteFrames" format=3]\n\n'
+        sprite_frames_string: str = '[gd_resource type="SpriteFrames" format=3]\n\n'
 
-            resource_paths: List[str] = []
-            for animation in sprite_frame['animations']:
-                for sprite in animation['sprites']:
-                    if not sprite['resource_path'] in resource_paths:
-                        resource_paths.append(sprite['resource_path'])
-                        sprite_frames_string += '[ext_resource path="%s" type="Texture" id=%i]\n' %\
-                            (sprite['resource_path'], len(resource_paths))
+        resource_paths: List[str] = []
+        for animation in sprite_frame['animations']:
+            for sprite in animation['sprites']:
+                if not sprite['resource_path'] in resource_paths:
+                    resource_paths.append(sprite['resource_path'])
+                    sprite_frames_string += '[ext_resource path="%s" type="Texture" id=%i]\n' %\
+                        (sprite['resource_path'], len(resource_paths))
 
-            sprite_frames_string += '\n'
+        sprite_frames_string += '\n'
 
-            sub_id: int = 1
+        sub_id: int = 1
 
-            animation_strings: List[str] = []
+        animation_strings: List[str] = []
 
-            for animation in sprite_frame['animations']:
-                frame_strings: List[str] = []
+        for animation in sprite_frame['animations']:
+            frame_strings: List[str] = []
 
-                for sprite in animation['sprites']:
-                    frame = sprite['frame']
-                    margin = sprite['margin']
+            for sprite in animation['sprites']:
+                frame = sprite['frame']
+                margin = sprite['margin']
 
-                    resource_id = resource_paths.index(sprite['resource_path']) + 1
+                resource_id = resource_paths.index(sprite['resource_path']) + 1
 
-                    sprite_frames_string += '''[sub_resource type="AtlasTexture" id=%i]
+                sprite_frames_string += '''[sub_resource type="AtlasTexture" id=%i]
 atlas = ExtResource(%i)
 region = Rect2(%i, %i, %i, %i)
 margin = Rect2(%i, %i, %i, %i)
 
 ''' % (sub_id, resource_id, frame['x'], frame['y'], frame['w'], frame['h'],
-                        margin['x'], margin['y'], margin['w'], margin['h'])
+                    margin['x'], margin['y'], margin['w'], margin['h'])
 
-                    frame_strings.append('{"duration": 1.0, "texture": SubResource(%i)}' % sub_id)
+                frame_strings.append('{"duration": 1.0, "texture": SubResource(%i)}' % sub_id)
 
-                    sub_id += 1
+                sub_id += 1
 
-                animation_strings.append('''{
+            animation_strings.append('''{
     "frames": [
         %s
     ],
@@ -671,14 +867,109 @@ margin = Rect2(%i, %i, %i, %i)
     "name": &"%s",
     "speed": %.1f
 }''' % (',\n        '.join(frame_strings),
-                    str(animation['loop']).lower(), animation['short_name'], animation['framerate']))
+                str(animation['loop']).lower(), animation['short_name'], animation['framerate']))
 
-            sprite_frames_string += '''[resource]
+        sprite_frames_string += '''[resource]
 animations = [%s]
     ''' % ', '.join(animation_strings)
 
-            with open(tres_path, 'w') as f:
-                f.write(sprite_frames_string)
+        with open(tres_path, 'w') as f:
+            f.write(sprite_frames_string)
+
+# --------------------------------------------------------------------------------------------------
+# Dry run: report what would be produced without writing anything
+# --------------------------------------------------------------------------------------------------
+
+def print_plan(args: argparse.Namespace, sprites: List[SpriteDict],
+    sprite_frames: List[SpriteFrameDict], converted_paths: List[str], bin_size: int,
+    bin_count: int) -> None:
+    print('\nEstimated %i spritesheets of size %ix%i (untrimmed sprites)\n'
+        % (bin_count, bin_size, bin_size))
+
+    print('Sprites (estimated sizes, SVG layers are skipped if Inkscape is missing):')
+    for sprite in sprites:
+        print('-> "%s" %ix%i%s' % (sprite['name'], sprite['size']['w'], sprite['size']['h'],
+            ' (animated)' if sprite['animated'] else ''))
+
+    print('\nAnimations:')
+    for sprite_frame in sprite_frames:
+        for animation in sprite_frame['animations']:
+            print('-> "%s" %i frames at %i fps%s' % (animation['name'], len(animation['sprites']),
+                animation['framerate'], ', looping' if animation['loop'] else ''))
+
+    output_paths: List[str] = list(converted_paths)
+
+    if not args.image_directory is None:
+        output_paths += [os.path.join(args.image_directory, '%s.png' % sprite['name'])
+            for sprite in sprites]
+
+    for b_i in range(bin_count):
+        path_prefix: str = get_path_prefix(args, b_i, bin_count)
+        output_paths.append(get_png_path(args, path_prefix, None))
+        if args.save_json:
+            output_paths.append('%s.json' % path_prefix)
+
+    if not args.godot_sprites_directory is None:
+        output_paths += [os.path.join(args.godot_sprites_directory, '%s.tres' % sprite['name'])
+            for sprite in sprites if not sprite['animated']]
+        output_paths += [os.path.join(args.godot_sprites_directory,
+            '%s.tres' % sprite_frame['name']) for sprite_frame in sprite_frames]
+
+    print('\nFiles:')
+    for path in output_paths:
+        print('-> %s "%s"' % ('overwrite' if os.path.exists(path) else 'create', path))
+
+# --------------------------------------------------------------------------------------------------
+# Entry point
+# --------------------------------------------------------------------------------------------------
+
+def main() -> None:
+    args: argparse.Namespace = parse_arguments()
+
+    print('Godot Universal SpritePacker %s\n' % __version__)
+
+    if args.dry_run:
+        print('Dry run: sizes are read from file headers and no files are written\n')
+    else:
+        # Prepare output directory
+        spritesheet_dir: str = os.path.dirname(args.spritesheet_path)
+        if spritesheet_dir != '':
+            os.makedirs(spritesheet_dir, exist_ok=True)
+
+    sprites: List[SpriteDict]
+    sprite_frames: List[SpriteFrameDict]
+    converted_paths: List[str]
+    sprites, sprite_frames, converted_paths = collect_sprites(args)
+
+    bin_size: int
+    bin_count: int
+
+    if len(sprites) == 0:
+        sys.exit('\nNo sprites found')
+
+    if args.dry_run:
+        # Sprites are not trimmed and SVG layers use the page size, so packing is an estimate
+        _, bin_size, bin_count = pack_sprites(args, sprites)
+
+        print_plan(args, sprites, sprite_frames, converted_paths, bin_size, bin_count)
+
+        print('\nCompleted (dry run)\n')
+
+        return
+
+    if not args.image_directory is None:
+        save_sprite_images(args, sprites)
+
+    if not args.disable_trimming:
+        trim_sprites(args, sprites)
+
+    bins: List[List[RectTuple]]
+    bins, bin_size, _ = pack_sprites(args, sprites)
+
+    write_atlases(args, sprites, sprite_frames, bins, bin_size)
+
+    if not args.godot_sprites_directory is None:
+        write_sprite_frames(args, sprite_frames)
 
     print('\nCompleted\n')
 